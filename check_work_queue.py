@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Script to check that concurrent workers process every ctl_work_queue task exactly once.
+
+Queues a batch of no-op tasks, runs several workers against them, and verifies that
+each task ends up done after a single claim. Workers run as separate processes on
+server databases, and as threads of one process on DuckDB, whose database file only
+accepts one writing process. With --ingest, each task is a one-row CSV file loaded by
+the real file-ingestion handler into a scratch table in the environment's schema, and
+the table must end up with exactly one row per file. Run it against a test
+environment: it refuses to start while the queue holds pending or running tasks, and
+removes its own tasks, files and table afterwards.
+
+Usage:
+    # Four workers, 200 tasks, against the default PG_* database
+    python check_work_queue.py
+
+    # Eight workers against the dev environment, with tasks that take 50 ms each
+    python check_work_queue.py --env dev --workers 8 --tasks 500 --task-seconds 0.05
+
+    # Load one-row CSV files through the file-ingestion handler instead
+    python check_work_queue.py --ingest
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
+from pandas import DataFrame
+from sqlalchemy import MetaData, Table, column, delete, func, select, table
+
+from etl.core import EtlEnvironment
+from etl.dba import EtlDbConfig, EtlDbSource
+from etl.dbs import EtlDbDataFrame
+from etl.sys import SysFolderType, SysTaskStatus, SysTaskType
+from etl.wrk import (
+    ACTIVE_STATUSES,
+    EtlWorker,
+    EtlWorkQueue,
+    ctl_work_queue,
+    file_ingest_handler,
+)
+
+
+def run_check_worker(
+    env_name: str, worker_id: str, task_seconds: float, sys_root: str = None
+) -> int:
+    """
+    Runs one worker until the queue is empty, with a no-op handler or, if
+    `sys_root` is given, the file-ingestion handler on that ETL root.
+
+    :return: The number of tasks the worker ran.
+    """
+    load_dotenv()
+    db_config = EtlDbConfig(env_name)
+    engine = EtlDbSource(db_config).get_engine()
+    if sys_root:
+        handler = file_ingest_handler(
+            EtlEnvironment(sys_root), EtlDbDataFrame(engine, db_config.db_schema)
+        )
+    else:
+        handler = lambda task: time.sleep(task_seconds)
+    worker = EtlWorker(
+        EtlWorkQueue(engine),
+        {SysTaskType.FILE: handler},
+        worker_id=worker_id,
+        poll_seconds=0.1,
+    )
+    try:
+        return worker.run(exit_when_empty=True)
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that concurrent workers process each queued task exactly once"
+    )
+    parser.add_argument(
+        "--env",
+        type=str,
+        help="Environment name (e.g., dev, prod) for database connection",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Number of workers (default: 4)"
+    )
+    parser.add_argument(
+        "--tasks", type=int, default=200, help="Number of tasks (default: 200)"
+    )
+    parser.add_argument(
+        "--task-seconds",
+        type=float,
+        default=0.01,
+        help="Time each no-op task sleeps (default: 0.01)",
+    )
+    parser.add_argument(
+        "--ingest",
+        action="store_true",
+        help="Load one-row CSV files through the file-ingestion handler",
+    )
+
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv()
+
+    # Setup database connection
+    db_config = EtlDbConfig(args.env)
+    engine = EtlDbSource(db_config).get_engine()
+    q = ctl_work_queue
+    ctl_work_queue.metadata.create_all(engine)
+
+    with engine.connect() as conn:
+        active = conn.execute(
+            select(func.count()).where(q.c.status.in_(ACTIVE_STATUSES))
+        ).scalar()
+    if active:
+        print(f"Error: ctl_work_queue holds {active} active task(s); use a test env")
+        sys.exit(1)
+
+    # Queue the tasks; a second enqueue of the same key must be rejected
+    run_id = uuid.uuid4().hex[:8]
+    queue = EtlWorkQueue(engine)
+    task_keys = [f"check-{run_id}-{i}" for i in range(args.tasks)]
+    sys_root = None
+    table_name = f"check_work_queue_{run_id}"
+    payload = None
+    if args.ingest:
+        sys_root = tempfile.mkdtemp(prefix="check_work_queue_")
+        env = EtlEnvironment(sys_root)
+        env.check_folders()
+        task_keys = [f"{task_key}.csv" for task_key in task_keys]
+        for i, task_key in enumerate(task_keys):
+            with open(
+                os.path.join(env.get_folder_path(SysFolderType.INBOX), task_key), "w"
+            ) as f:
+                f.write(f"task,value\n{i},{i * 10}\n")
+        # Create the table up front so workers only append to it
+        EtlDbDataFrame(engine, db_config.db_schema).write_dataframe_to_sql_overwrite(
+            DataFrame({"task": [0], "value": [0]}).iloc[0:0], table_name
+        )
+        payload = {"file_key": table_name, "file_type": "csv"}
+    for task_key in task_keys:
+        queue.enqueue(SysTaskType.FILE, task_key, payload)
+    duplicates = [
+        k
+        for k in task_keys[:10]
+        if queue.enqueue(SysTaskType.FILE, k, payload) is not None
+    ]
+
+    worker_ids = [f"check-{run_id}-w{i}" for i in range(args.workers)]
+    if engine.dialect.name == "duckdb":
+        executor = ThreadPoolExecutor(max_workers=args.workers)
+    else:
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+    started = time.perf_counter()
+    with executor:
+        processed = list(
+            executor.map(
+                run_check_worker,
+                [args.env] * args.workers,
+                worker_ids,
+                [args.task_seconds] * args.workers,
+                [sys_root] * args.workers,
+            )
+        )
+    elapsed = time.perf_counter() - started
+
+    check_rows = q.c.task_key.like(f"check-{run_id}-%")
+    with engine.begin() as conn:
+        rows = conn.execute(
+            select(q.c.task_key, q.c.status, q.c.attempts, q.c.worker_id).where(
+                check_rows
+            )
+        ).all()
+        conn.execute(delete(q).where(check_rows))
+
+    errors = []
+    if args.ingest:
+        loaded = table(table_name, column("task"), schema=db_config.db_schema)
+        with engine.begin() as conn:
+            row_count, task_count = conn.execute(
+                select(func.count(), func.count(func.distinct(loaded.c.task)))
+            ).one()
+        Table(table_name, MetaData(), schema=db_config.db_schema).drop(engine)
+        left_in_inbox = os.listdir(
+            EtlEnvironment(sys_root).get_folder_path(SysFolderType.INBOX)
+        )
+        shutil.rmtree(sys_root)
+        if row_count != args.tasks or task_count != args.tasks:
+            errors.append(
+                f"{row_count} rows for {task_count} files loaded, expected {args.tasks}"
+            )
+        if left_in_inbox:
+            errors.append(f"{len(left_in_inbox)} file(s) left in the inbox")
+    engine.dispose()
+
+    if duplicates:
+        errors.append(f"{len(duplicates)} duplicate enqueue(s) were accepted")
+    if len(rows) != args.tasks:
+        errors.append(f"{len(rows)} task rows found, expected {args.tasks}")
+    not_done = [r for r in rows if r.status != SysTaskStatus.DONE.value]
+    if not_done:
+        errors.append(f"{len(not_done)} task(s) not done, e.g. {not_done[0]}")
+    reclaimed = [r for r in rows if r.attempts != 1]
+    if reclaimed:
+        errors.append(f"{len(reclaimed)} task(s) claimed more than once")
+    if sum(processed) != args.tasks:
+        errors.append(f"workers ran {sum(processed)} tasks, expected {args.tasks}")
+
+    per_worker = Counter(r.worker_id for r in rows)
+    print(
+        f"Backend={engine.dialect.name} Workers={args.workers} Tasks={args.tasks} "
+        f"Seconds={elapsed:.2f} TasksPerSecond={args.tasks / elapsed:.1f}"
+    )
+    for worker_id in worker_ids:
+        print(f"  {worker_id}: {per_worker.get(worker_id, 0)} task(s)")
+    if errors:
+        for error in errors:
+            print(f"Error: {error}")
+        sys.exit(1)
+    print("OK: every task was processed exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import os
+import shutil
+from typing import Iterable, List, Optional, Union
+
+import pandas as pd
+from pandas import DataFrame
+
+from .core import EtlEnvironment
+from .sys import SysFolderType
+
+KEY_HASH_COLUMN = "_etl_key_hash"
+ROW_HASH_COLUMN = "_etl_row_hash"
+PARTITION_COLUMN = "_etl_part"
+DEFAULT_PARTITIONS = 16
+SCHEMA_FILE = "_schema.parquet"
+MISSING_VALUE = "\x00<missing>"
+
+_HASH_COLUMNS = (KEY_HASH_COLUMN, ROW_HASH_COLUMN)
+
+
+class EtlSnapshotDelta:
+    """
+    Rows that changed between two snapshots of the same source.
+
+    :ivar inserted: Rows whose key is only present in the new snapshot.
+    :type inserted: DataFrame
+    :ivar updated: Rows whose key is present in both snapshots but whose values changed.
+    :type updated: DataFrame
+    :ivar deleted: Key columns of rows that are only present in the previous snapshot.
+    :type deleted: DataFrame
+    """
+
+    def __init__(self, inserted: DataFrame, updated: DataFrame, deleted: DataFrame):
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+
+    def is_empty(self) -> bool:
+        return self.inserted.empty and self.updated.empty and self.deleted.empty
+
+    def __repr__(self) -> str:
+        return (
+            f"EtlSnapshotDelta(inserted={len(self.inserted)}, "
+            f"updated={len(self.updated)}, deleted={len(self.deleted)})"
+        )
+
+
+class EtlSnapshotDiff:
+    """
+    Compares a full-file delivery with the previous snapshot of the same source.
+
+    The previous snapshot is kept as a Parquet dataset under the DATA folder
+    (`dat/<snapshot_key>/`), partitioned by a hash of the key columns. The new
+    delivery can be passed as an iterator of chunks (e.g. `FileSource.read_chunks`);
+    each chunk is hashed and spilled into the same partitions next to the stored
+    snapshot, and the two sides are then compared one partition at a time. Only
+    one partition of each side, plus the resulting delta, is held in memory.
+
+    Values are hashed in a canonical text form, so a column that changes dtype
+    between deliveries (e.g. integers that become floats because of a blank cell)
+    does not make every row look updated.
+
+    :ivar snapshot_path: Directory holding the partitioned Parquet snapshot.
+    :type snapshot_path: str
+    :ivar key_columns: Columns that uniquely identify a row.
+    :type key_columns: list
+    :ivar partitions: Number of hash partitions the snapshot is split into.
+    :type partitions: int
+    """
+
+    def __init__(
+        self,
+        env: EtlEnvironment,
+        snapshot_key: str,
+        key_columns: List[str],
+        partitions: int = DEFAULT_PARTITIONS,
+    ):
+        self.snapshot_path = os.path.join(
+            env.get_folder_path(SysFolderType.DATA), snapshot_key
+        )
+        self.staging_path = f"{self.snapshot_path}.new"
+        self.retired_path = f"{self.snapshot_path}.old"
+        self.key_columns = list(key_columns)
+        self.partitions = partitions
+
+    def has_snapshot(self) -> bool:
+        self._recover()
+        return os.path.isdir(self.snapshot_path)
+
+    def diff(self, frames: Union[DataFrame, Iterable[DataFrame]]) -> EtlSnapshotDelta:
+        """
+        Computes the inserted, updated and deleted rows of a new delivery against
+        the stored snapshot.
+
+        The delivery is staged as the next snapshot; call `save()` afterwards to
+        make it the stored snapshot. If no snapshot exists yet, every row is
+        reported as inserted.
+
+        :param frames: The new full snapshot, as one DataFrame or an iterator of chunks.
+        :type frames: DataFrame or iterable of DataFrame
+        :return: The delta between the stored snapshot and the new delivery.
+        :rtype: EtlSnapshotDelta
+        """
+        self._recover()
+        self._stage(frames)
+        new_empty = self._empty_like(self.staging_path)
+        if new_empty is None:
+            raise ValueError("The new delivery yielded no DataFrame chunks")
+        old_empty = self._empty_like(self.snapshot_path)
+        if old_empty is None:
+            old_empty = new_empty[self.key_columns + [KEY_HASH_COLUMN, ROW_HASH_COLUMN]]
+        columns = [c for c in new_empty.columns if c not in _HASH_COLUMNS]
+
+        inserted, updated, deleted = [], [], []
+        for part in range(self.partitions):
+            new_part = self._read_partition(self.staging_path, part, new_empty)
+            old_part = self._read_partition(self.snapshot_path, part, old_empty)
+            if new_part.empty and old_part.empty:
+                continue
+            is_new = ~new_part[KEY_HASH_COLUMN].isin(old_part[KEY_HASH_COLUMN])
+            is_same = self._pairs(new_part).isin(self._pairs(old_part))
+            is_changed = ~is_new.to_numpy() & ~is_same
+            inserted.append(new_part[is_new.to_numpy()])
+            updated.append(new_part[is_changed])
+            deleted.append(
+                old_part[~old_part[KEY_HASH_COLUMN].isin(new_part[KEY_HASH_COLUMN])]
+            )
+
+        return EtlSnapshotDelta(
+            self._concat(inserted, new_empty, columns),
+            self._concat(updated, new_empty, columns),
+            self._concat(deleted, old_empty, self.key_columns),
+        )
+
+    def save(self, frames: Union[DataFrame, Iterable[DataFrame], None] = None):
+        """
+        Replaces the stored snapshot with the delivery staged by `diff`, or with
+        `frames` if given.
+
+        The new snapshot is written next to the old one and swapped in afterwards:
+        the old snapshot is renamed aside, the new one renamed into place, and only
+        then is the old one deleted. A crash at any point leaves a complete snapshot,
+        which the next `diff` or `save` picks up.
+
+        :param frames: The new full snapshot, as one DataFrame or an iterator of chunks.
+        :type frames: DataFrame or iterable of DataFrame or None
+        """
+        if frames is not None:
+            self._stage(frames)
+        elif not os.path.isdir(self.staging_path):
+            raise ValueError("No staged snapshot; call diff() first or pass frames")
+        if self.has_snapshot():
+            if os.path.isdir(self.retired_path):
+                shutil.rmtree(self.retired_path)
+            os.replace(self.snapshot_path, self.retired_path)
+        os.replace(self.staging_path, self.snapshot_path)
+        if os.path.isdir(self.retired_path):
+            shutil.rmtree(self.retired_path)
+
+    def _recover(self):
+        # Finish or roll back a save that crashed between its renames
+        if not os.path.isdir(self.retired_path):
+            return
+        if os.path.isdir(self.snapshot_path):
+            shutil.rmtree(self.retired_path)
+        else:
+            os.replace(self.retired_path, self.snapshot_path)
+
+    def _stage(self, frames: Union[DataFrame, Iterable[DataFrame]]):
+        if isinstance(frames, DataFrame):
+            frames = [frames]
+        if os.path.isdir(self.staging_path):
+            shutil.rmtree(self.staging_path)
+        os.makedirs(self.staging_path)
+        for chunk_no, chunk in enumerate(frames):
+            hashed = self._hash(chunk)
+            if chunk_no == 0:
+                # Keep the schema even when the delivery has no rows
+                hashed.iloc[0:0].drop(columns=PARTITION_COLUMN).to_parquet(
+                    os.path.join(self.staging_path, SCHEMA_FILE), index=False
+                )
+            for part, rows in hashed.groupby(PARTITION_COLUMN, sort=False):
+                part_path = os.path.join(
+                    self.staging_path, f"{PARTITION_COLUMN}={part}"
+                )
+                os.makedirs(part_path, exist_ok=True)
+                rows.drop(columns=PARTITION_COLUMN).to_parquet(
+                    os.path.join(part_path, f"chunk-{chunk_no:06d}.parquet"),
+                    index=False,
+                )
+
+    def _hash(self, df: DataFrame) -> DataFrame:
+        # Hash columns in name order, so a delivery that only reorders its columns
+        # hashes the same
+        key_columns = sorted(self.key_columns, key=str)
+        value_columns = sorted(
+            (c for c in df.columns if c not in self.key_columns), key=str
+        )
+        hashed = df.reset_index(drop=True)
+        key_hash = pd.util.hash_pandas_object(
+            _canonical(hashed[key_columns]), index=False
+        )
+        if value_columns:
+            row_hash = pd.util.hash_pandas_object(
+                _canonical(hashed[value_columns]), index=False
+            )
+        else:
+            row_hash = key_hash
+        return hashed.assign(
+            **{
+                KEY_HASH_COLUMN: key_hash.to_numpy(),
+                ROW_HASH_COLUMN: row_hash.to_numpy(),
+                PARTITION_COLUMN: (key_hash % self.partitions).astype("int64"),
+            }
+        )
+
+    @staticmethod
+    def _empty_like(base_path: str) -> Optional[DataFrame]:
+        # An empty frame with the dtypes stored on disk, used for missing partitions
+        schema_path = os.path.join(base_path, SCHEMA_FILE)
+        if not os.path.exists(schema_path):
+            return None
+        return pd.read_parquet(schema_path)
+
+    @staticmethod
+    def _read_partition(base_path: str, part: int, empty: DataFrame) -> DataFrame:
+        part_path = os.path.join(base_path, f"{PARTITION_COLUMN}={part}")
+        if not os.path.isdir(part_path):
+            return empty
+        # Read chunk files one by one: their dtypes may differ between chunks
+        return pd.concat(
+            [
+                pd.read_parquet(os.path.join(part_path, f))
+                for f in sorted(os.listdir(part_path))
+            ],
+            ignore_index=True,
+        )
+
+    @staticmethod
+    def _pairs(df: DataFrame) -> pd.MultiIndex:
+        return pd.MultiIndex.from_arrays([df[KEY_HASH_COLUMN], df[ROW_HASH_COLUMN]])
+
+    @staticmethod
+    def _concat(frames: List[DataFrame], empty: DataFrame, columns) -> DataFrame:
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return empty[list(columns)].copy()
+        return pd.concat(frames)[list(columns)].reset_index(drop=True)
+
+
+def _canonical(df: DataFrame) -> DataFrame:
+    """
+    Renders values as text so equal values hash equally regardless of dtype:
+    integral floats lose their ".0" and all missing values share one marker.
+    """
+    out = {}
+    for name, col in df.items():
+        if pd.api.types.is_float_dtype(col.dtype):
+            # Beyond 2**53 floats no longer hold exact integers
+            integral = col.notna() & (col == col.round()) & (col.abs() < 2**53)
+            text = col.astype(str)
+            text[integral] = col[integral].astype("int64").astype(str)
+        else:
+            text = col.astype(str)
+        out[name] = text.where(col.notna(), MISSING_VALUE)
+    return pd.DataFrame(out)
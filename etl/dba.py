@@ -37,12 +37,15 @@ class EtlDbConfig:
     :ivar db_type: The database type extracted from the configuration. Defaults
         to "postgresql+psycopg" if not explicitly specified.
     :type db_type: str
+    :ivar db_schema: The schema tables are read from and written to. Defaults to
+        "main" for DuckDB, the database name for MySQL and "public" otherwise.
+    :type db_schema: str
     """
 
     def __init__(self, env_name: str = None):
         if env_name:
             self.env_name = env_name.upper()
-            self.env_prefix = f"PG_{env_name}_"
+            self.env_prefix = f"PG_{self.env_name}_"
         else:
             self.env_name = None
             self.env_prefix = "PG_"
@@ -53,10 +56,18 @@ class EtlDbConfig:
         self.db_host = self.get_config_var("HOST", "localhost")
         self.db_port = self.get_config_var("PORT", "5532")
         self.db_type = self.get_config_var("TYPE", "postgresql+psycopg")
+        self.db_schema = self.get_config_var("SCHEMA", self._default_schema())
 
     def get_config_var(self, var_name: str, default_value=None) -> str:
         return os.environ.get(f"{self.env_prefix}{var_name.upper()}", default_value)
 
+    def _default_schema(self) -> str:
+        if self.db_type.startswith("duckdb"):
+            return "main"
+        if self.db_type.startswith("mysql"):
+            return self.db_name
+        return "public"
+
     def get_sqlalchemy_uri(self) -> str:
         """
         Constructs the SQLAlchemy connection URI based on database type.
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import pyarrow as pa
+from pandas import DataFrame
+from sqlalchemy import Engine
+
+from .core import EtlEnvironment
+from .sys import SysFolderType
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+INDEX_FILE = "index.json"
+INVALIDATIONS_FILE = "invalidations.json"
+LOCK_FILE = "index.lock"
+# Table entry of a query whose tables could not be determined; any write drops it
+ANY_TABLE = "*"
+
+_IDENTIFIER = r"(?:\"[^\"]*\"|`[^`]*`|\[[^\]]*\]|[A-Za-z_][\w$]*)"
+_SQL_TOKEN = re.compile(
+    rf"(?P<comment>--[^\n]*|/\*.*?\*/)|(?P<string>'(?:[^']|'')*')"
+    rf"|(?P<name>{_IDENTIFIER}(?:\s*\.\s*{_IDENTIFIER})*)|(?P<other>\S)",
+    re.DOTALL,
+)
+# Keywords that end a FROM list
+_FROM_LIST_END = {
+    "where",
+    "group",
+    "order",
+    "having",
+    "limit",
+    "offset",
+    "union",
+    "intersect",
+    "except",
+    "window",
+    "fetch",
+    "for",
+    "returning",
+    "select",
+    "set",
+    "values",
+}
+# Keywords that may precede a table or subquery in a FROM list
+_FROM_ITEM_PREFIX = {"only", "lateral"}
+
+
+def _normalize_table_name(name: str) -> str:
+    # Compare unqualified, unquoted, lower-case names so "public.Ref" matches ref
+    return re.sub(r"[\"`\[\]\s]", "", name).split(".")[-1].lower()
+
+
+def _referenced_tables(sql: str) -> List[str]:
+    """
+    Returns the tables a query reads from: every item of its FROM lists, including
+    comma-separated ones, and every joined table, at any subquery depth. Returns
+    `[ANY_TABLE]` when the query cannot be read this way.
+    """
+    tables = set()
+    # Per parenthesis depth: [inside a FROM list, expecting a table next]
+    frames = [[False, False]]
+    for match in _SQL_TOKEN.finditer(sql):
+        kind, token = match.lastgroup, match.group()
+        frame = frames[-1]
+        if kind == "comment":
+            continue
+        word = token.lower() if kind == "name" else None
+        if token == "(":
+            frame[1] = False
+            frames.append([False, False])
+        elif token == ")":
+            frames.pop()
+            if not frames:
+                return [ANY_TABLE]
+        elif word == "from":
+            frame[:] = [True, True]
+        elif word == "join":
+            frame[1] = True
+        elif word in _FROM_LIST_END:
+            frame[:] = [False, False]
+        elif frame[1]:
+            if word is None:
+                return [ANY_TABLE]
+            if word not in _FROM_ITEM_PREFIX:
+                tables.add(_normalize_table_name(token))
+                frame[1] = False
+        elif token == "," and frame[0]:
+            frame[1] = True
+    if len(frames) != 1:
+        return [ANY_TABLE]
+    return sorted(tables)
+
+
+def _has_nested_values(df: DataFrame) -> bool:
+    # Arrow turns dicts into structs and lists into arrays, which do not come back
+    # as the objects the query returned
+    for name in df.select_dtypes(include="object").columns:
+        if df[name].map(lambda v: isinstance(v, (dict, list, tuple, set))).any():
+            return True
+    return False
+
+
+class EtlQueryCache:
+    """
+    On-disk cache of query results stored as Arrow IPC files.
+
+    Results are keyed on the normalized SQL text, the query parameters and the
+    engine URI (without password). Cached files are memory-mapped when read back.
+    Entries expire after `ttl_seconds`, the least recently used entries are evicted
+    once the cache grows past `max_bytes`, and every entry whose query reads from
+    a table is dropped when that table is written through `EtlDbDataFrame`.
+
+    Each invalidation also bumps a per-table counter. A reader captures the
+    counters with `invalidation_state` before running its query and passes them to
+    `put`, which refuses to store the result if a table it reads was written in
+    the meantime, so a read that overlaps a write never caches pre-write data.
+
+    The cache lives in `<folder>/query_cache` and persists across runs. Its index is
+    re-read from disk under an exclusive lock on `index.lock` on every operation, so
+    several processes can share one folder; an entry whose file has gone missing is
+    treated as a miss. Results Arrow cannot store faithfully (mixed-type columns,
+    dicts or lists) are not cached and are simply re-read from the database.
+
+    :ivar cache_dir: Directory holding the Arrow files and the index.
+    :type cache_dir: str
+    :ivar max_bytes: Size limit of all cached files together.
+    :type max_bytes: int
+    :ivar ttl_seconds: Lifetime of an entry in seconds, or None for no expiry.
+    :type ttl_seconds: float or None
+    """
+
+    def __init__(
+        self,
+        env: EtlEnvironment,
+        folder_type: SysFolderType = SysFolderType.TEMP,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = None,
+    ):
+        self.cache_dir = os.path.join(env.get_folder_path(folder_type), "query_cache")
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        eng: Engine, sql: str, sql_params: Optional[Union[Dict[str, Any], list]] = None
+    ) -> str:
+        normalized_sql = " ".join(str(sql).split()).rstrip(";")
+        key_parts = json.dumps(
+            [
+                eng.url.render_as_string(hide_password=True),
+                normalized_sql,
+                sql_params,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(key_parts.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[DataFrame]:
+        """
+        Returns the cached result for `key`, or None on a miss or expired entry.
+        """
+        with self._locked():
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            path = os.path.join(self.cache_dir, entry["file"])
+            if self._is_expired(entry) or not os.path.exists(path):
+                self._remove(index, key)
+                self._save_index(index)
+                return None
+            entry["last_access"] = time.time()
+            self._save_index(index)
+
+        try:
+            with pa.memory_map(path) as source:
+                return pa.ipc.open_file(source).read_all().to_pandas()
+        except FileNotFoundError:
+            # Evicted by another process between the index lookup and the read
+            return None
+
+    def invalidation_state(self, eng: Engine) -> Dict[str, int]:
+        """
+        Returns the invalidation counters of the tables of `eng`; capture them
+        before running a query and pass them to `put`.
+        """
+        engine_uri = eng.url.render_as_string(hide_password=True)
+        with self._locked():
+            return self._load_index(INVALIDATIONS_FILE).get(engine_uri, {})
+
+    def put(
+        self,
+        key: str,
+        df: DataFrame,
+        eng: Engine,
+        sql: str,
+        state: Optional[Dict[str, int]] = None,
+    ) -> bool:
+        """
+        Stores `df` as the result for `key` and evicts entries over the size limit.
+
+        :param state: The `invalidation_state` captured before the query ran. If any
+            table the query reads has been invalidated since, `df` is not cached.
+        :type state: dict or None
+        :return: False if `df` was not cached (stale, or not storable as Arrow).
+        :rtype: bool
+        """
+        engine_uri = eng.url.render_as_string(hide_password=True)
+        tables = _referenced_tables(str(sql))
+        if state is not None and self._is_stale(engine_uri, tables, state):
+            return False
+        if _has_nested_values(df):
+            return False
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, ValueError):
+            # e.g. an object column mixing ints and strings
+            return False
+
+        file_name = f"{key}.arrow"
+        path = os.path.join(self.cache_dir, file_name)
+        staging_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(staging_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        now = time.time()
+        with self._locked():
+            # Check again under the lock: a write may have finished while the
+            # Arrow file was being written
+            if state is not None and self._is_stale(engine_uri, tables, state):
+                os.remove(staging_path)
+                return False
+            os.replace(staging_path, path)
+            index = self._load_index()
+            index[key] = {
+                "file": file_name,
+                "size": os.path.getsize(path),
+                "created": now,
+                "last_access": now,
+                "engine": engine_uri,
+                "tables": tables,
+            }
+            self._evict(index)
+            self._save_index(index)
+        return True
+
+    def invalidate_table(self, eng: Engine, table_name: str) -> int:
+        """
+        Drops every entry of `eng` whose query reads from `table_name`, or whose
+        tables could not be determined.
+
+        :return: The number of entries that were dropped.
+        :rtype: int
+        """
+        engine_uri = eng.url.render_as_string(hide_password=True)
+        table_name = _normalize_table_name(table_name)
+        with self._locked():
+            invalidations = self._load_index(INVALIDATIONS_FILE)
+            counters = invalidations.setdefault(engine_uri, {})
+            counters[table_name] = counters.get(table_name, 0) + 1
+            self._save_index(invalidations, INVALIDATIONS_FILE)
+
+            index = self._load_index()
+            stale = [
+                key
+                for key, entry in index.items()
+                if entry["engine"] == engine_uri
+                and (table_name in entry["tables"] or ANY_TABLE in entry["tables"])
+            ]
+            for key in stale:
+                self._remove(index, key)
+            if stale:
+                self._save_index(index)
+            return len(stale)
+
+    def clear(self):
+        with self._locked():
+            index = self._load_index()
+            for key in list(index):
+                self._remove(index, key)
+            self._save_index(index)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # The thread lock serializes this process, the file lock other processes
+        with self._lock, open(os.path.join(self.cache_dir, LOCK_FILE), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.01)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _is_stale(
+        self, engine_uri: str, tables: List[str], state: Dict[str, int]
+    ) -> bool:
+        counters = self._load_index(INVALIDATIONS_FILE).get(engine_uri, {})
+        if ANY_TABLE in tables:
+            return counters != state
+        return any(counters.get(t, 0) != state.get(t, 0) for t in tables)
+
+    def _is_expired(self, entry: Dict[str, Any]) -> bool:
+        return (
+            self.ttl_seconds is not None
+            and time.time() - entry["created"] > self.ttl_seconds
+        )
+
+    def _evict(self, index: Dict[str, Dict[str, Any]]):
+        for key in [k for k, entry in index.items() if self._is_expired(entry)]:
+            self._remove(index, key)
+        lru_keys: List[str] = sorted(index, key=lambda k: index[k]["last_access"])
+        total = sum(entry["size"] for entry in index.values())
+        # Always keep the most recent entry, even if it alone exceeds the limit
+        for key in lru_keys[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= index[key]["size"]
+            self._remove(index, key)
+
+    def _remove(self, index: Dict[str, Dict[str, Any]], key: str):
+        entry = index.pop(key)
+        try:
+            os.remove(os.path.join(self.cache_dir, entry["file"]))
+        except FileNotFoundError:
+            pass
+
+    def _load_index(self, file_name: str = INDEX_FILE) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.cache_dir, file_name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(
+        self, index: Dict[str, Dict[str, Any]], file_name: str = INDEX_FILE
+    ):
+        path = os.path.join(self.cache_dir, file_name)
+        staging_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(staging_path, "w") as f:
+            json.dump(index, f)
+        os.replace(staging_path, path)
@@ -1,16 +1,23 @@
 import pandas as pd
 from pandas import DataFrame
-from sqlalchemy import Engine
-from typing import Any, Dict, Optional, Union
+from sqlalchemy import Engine, MetaData, Table, column, delete, select, table, tuple_
+from typing import Any, Dict, List, Optional, Union
+
+from .cdc import EtlSnapshotDelta
+from .dbc import EtlQueryCache
 
 
 class EtlDbDataFrame:
-    def __init__(self, eng: Engine, schema_name: str = None):
+    def __init__(
+        self, eng: Engine, schema_name: str = None, cache: EtlQueryCache = None
+    ):
         self.engine = eng
         if schema_name:
             self.schema_name = schema_name
         else:
             self.schema_name = "public"
+        # Opt-in result cache for read_sql_as_dataframe; writes invalidate it
+        self.cache = cache
 
     def read_table_as_dataframe(self, table_name: str) -> DataFrame:
         return pd.read_sql_table(table_name, self.engine, schema=self.schema_name)
@@ -18,7 +25,17 @@ class EtlDbDataFrame:
     def read_sql_as_dataframe(
         self, sql: str, sql_params: Optional[Union[Dict[str, Any], list]] = None
     ) -> DataFrame:
-        return pd.read_sql_query(sql=sql, con=self.engine, params=sql_params)
+        if self.cache is None:
+            return pd.read_sql_query(sql=sql, con=self.engine, params=sql_params)
+
+        key = self.cache.make_key(self.engine, sql, sql_params)
+        df = self.cache.get(key)
+        if df is None:
+            # Captured before the query so a concurrent write prevents caching
+            state = self.cache.invalidation_state(self.engine)
+            df = pd.read_sql_query(sql=sql, con=self.engine, params=sql_params)
+            self.cache.put(key, df, self.engine, sql, state)
+        return df
 
     def write_dataframe_to_sql_overwrite(self, df: DataFrame, table_name: str):
         df.to_sql(
@@ -28,6 +45,7 @@ class EtlDbDataFrame:
             index=False,
             schema=self.schema_name,
         )
+        self._invalidate(table_name)
 
     def write_dataframe_to_sql_append(self, df: DataFrame, table_name: str):
         df.to_sql(
@@ -37,3 +55,64 @@ class EtlDbDataFrame:
             index=False,
             schema=self.schema_name,
         )
+        self._invalidate(table_name)
+
+    def write_dataframe_delta(
+        self, delta: EtlSnapshotDelta, table_name: str, key_columns: List[str]
+    ):
+        """
+        Applies a snapshot delta to a table instead of reloading the full snapshot.
+
+        Rows of the updated and deleted sets are removed by key, then the inserted
+        and updated rows are appended, all in one transaction. The keys to remove
+        are staged in a scratch table so the delete is a single set-based statement.
+
+        :param delta: The delta produced by `EtlSnapshotDiff.diff`.
+        :type delta: EtlSnapshotDelta
+        :param table_name: The target table, which must already exist.
+        :type table_name: str
+        :param key_columns: Columns that uniquely identify a row in the target table.
+        :type key_columns: list
+        """
+        stale_keys = pd.concat(
+            [delta.updated[key_columns], delta.deleted[key_columns]]
+        ).drop_duplicates()
+        new_rows = pd.concat([delta.inserted, delta.updated])
+        stage_name = f"{table_name}_etl_delta_keys"
+
+        with self.engine.begin() as conn:
+            if not stale_keys.empty:
+                stale_keys.to_sql(
+                    stage_name,
+                    conn,
+                    if_exists="replace",
+                    index=False,
+                    schema=self.schema_name,
+                )
+                target = table(
+                    table_name,
+                    *[column(k) for k in key_columns],
+                    schema=self.schema_name,
+                )
+                stage = table(
+                    stage_name,
+                    *[column(k) for k in key_columns],
+                    schema=self.schema_name,
+                )
+                conn.execute(
+                    delete(target).where(tuple_(*target.c).in_(select(*stage.c)))
+                )
+                Table(stage_name, MetaData(), schema=self.schema_name).drop(conn)
+            if not new_rows.empty:
+                new_rows.to_sql(
+                    table_name,
+                    conn,
+                    if_exists="append",
+                    index=False,
+                    schema=self.schema_name,
+                )
+        self._invalidate(table_name)
+
+    def _invalidate(self, table_name: str):
+        if self.cache is not None:
+            self.cache.invalidate_table(self.engine, table_name)
@@ -0,0 +1,157 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from pandas import DataFrame
+
+from .dba import EtlDbConfig, EtlDbSource
+from .dbs import EtlDbDataFrame
+
+
+class EtlDbTargetResult:
+    """
+    Outcome of loading a DataFrame into a single database target.
+
+    :ivar env_name: The environment name of the target (None for the default PG_* target).
+    :type env_name: str or None
+    :ivar table_name: The table that was written.
+    :type table_name: str
+    :ivar row_count: The number of rows sent to the target.
+    :type row_count: int
+    :ivar elapsed_seconds: Wall-clock time spent writing to the target.
+    :type elapsed_seconds: float
+    :ivar error: The exception raised by the target, or None on success.
+    :type error: Exception or None
+    """
+
+    def __init__(
+        self,
+        env_name: Optional[str],
+        table_name: str,
+        row_count: int,
+        elapsed_seconds: float,
+        error: Optional[Exception] = None,
+    ):
+        self.env_name = env_name
+        self.table_name = table_name
+        self.row_count = row_count
+        self.elapsed_seconds = elapsed_seconds
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.row_count / self.elapsed_seconds
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return (
+            f"EtlDbTargetResult(env={self.env_name}, table={self.table_name}, "
+            f"rows={self.row_count}, seconds={self.elapsed_seconds:.3f}, {status})"
+        )
+
+
+class EtlDbTargets:
+    """
+    Loads one DataFrame into several configured database environments concurrently.
+
+    Each environment name is resolved through `EtlDbConfig` (e.g. "dev" reads PG_DEV_*),
+    and gets its own pooled engine from `EtlDbSource.get_engine()`. Each target
+    writes to its own schema: the entry in `schema_names` if given, otherwise the
+    environment's `EtlDbConfig.db_schema` (PG_<ENV>_SCHEMA, or the backend default).
+    The DataFrame is read once by the caller and shared by all targets, so the
+    source is never re-read. Failures, including engine setup errors, are reported
+    per target and do not stop the other targets.
+
+    :ivar targets: Mapping of environment name to the `EtlDbDataFrame` used to write it.
+    :type targets: dict
+    :ivar setup_errors: Mapping of environment name to the error raised while
+        creating its engine; these targets are reported as failed on every write.
+    :type setup_errors: dict
+    :ivar max_workers: Maximum number of targets written at the same time.
+    :type max_workers: int
+    """
+
+    def __init__(
+        self,
+        env_names: List[Optional[str]],
+        schema_names: Dict[Optional[str], str] = None,
+        max_workers: int = None,
+    ):
+        schema_names = schema_names or {}
+        self.targets: Dict[Optional[str], EtlDbDataFrame] = {}
+        self.setup_errors: Dict[Optional[str], Exception] = {}
+        for env_name in env_names:
+            try:
+                db_config = EtlDbConfig(env_name)
+                engine = EtlDbSource(db_config).get_engine()
+            except Exception as e:
+                self.setup_errors[env_name] = e
+                continue
+            self.targets[env_name] = EtlDbDataFrame(
+                engine, schema_names.get(env_name, db_config.db_schema)
+            )
+        self.max_workers = max_workers or max(len(self.targets), 1)
+
+    def write_dataframe_to_sql_overwrite(
+        self, df: DataFrame, table_name: str
+    ) -> Dict[Optional[str], EtlDbTargetResult]:
+        return self._write_all(df, table_name, "replace")
+
+    def write_dataframe_to_sql_append(
+        self, df: DataFrame, table_name: str
+    ) -> Dict[Optional[str], EtlDbTargetResult]:
+        return self._write_all(df, table_name, "append")
+
+    def dispose(self):
+        """
+        Closes the connection pools of all target engines.
+        """
+        for target in self.targets.values():
+            target.engine.dispose()
+
+    def _write_all(
+        self, df: DataFrame, table_name: str, if_exists: str
+    ) -> Dict[Optional[str], EtlDbTargetResult]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                env_name: executor.submit(
+                    self._write_one, env_name, target, df, table_name, if_exists
+                )
+                for env_name, target in self.targets.items()
+            }
+            results = {
+                env_name: EtlDbTargetResult(env_name, table_name, len(df), 0.0, e)
+                for env_name, e in self.setup_errors.items()
+            }
+            results.update(
+                {env_name: future.result() for env_name, future in futures.items()}
+            )
+            return results
+
+    @staticmethod
+    def _write_one(
+        env_name: Optional[str],
+        target: EtlDbDataFrame,
+        df: DataFrame,
+        table_name: str,
+        if_exists: str,
+    ) -> EtlDbTargetResult:
+        started = time.perf_counter()
+        try:
+            if if_exists == "replace":
+                target.write_dataframe_to_sql_overwrite(df, table_name)
+            else:
+                target.write_dataframe_to_sql_append(df, table_name)
+        except Exception as e:
+            return EtlDbTargetResult(
+                env_name, table_name, len(df), time.perf_counter() - started, e
+            )
+        return EtlDbTargetResult(
+            env_name, table_name, len(df), time.perf_counter() - started
+        )
@@ -1,26 +1,308 @@
+import importlib.util
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Union
+
 import pandas as pd
 from pandas import DataFrame
+from pandas.io.parsers import TextParser
+
 from .sys import SysFileType
 
+DEFAULT_CHUNKSIZE = 50_000
+DEFAULT_XML_ROW_XPATH = "./*"
+
+# Workbook formats openpyxl can stream in read-only mode
+_OPENPYXL_EXTENSIONS = (".xlsx", ".xlsm", ".xltx", ".xltm")
+
+
+def _is_streamable_workbook(file_path) -> bool:
+    return os.fspath(file_path).lower().endswith(_OPENPYXL_EXTENSIONS)
+
+
+def _has_calamine() -> bool:
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def _rows_to_dataframe(header: list, rows: List[list]) -> DataFrame:
+    # TextParser applies the same dtype inference as read_csv/read_excel/read_xml,
+    # and names blank and repeated headers the same way ("Unnamed: 3", "a.1")
+    return TextParser([header, *rows], header=0).read()
+
+
+def _convert_cell(value):
+    # Same conversions as pandas' openpyxl reader: blank cells become "" (parsed
+    # as NaN) and integral floats become ints
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _iter_openpyxl_rows(
+    file_path: str, sheet_name: Union[int, str], chunksize: int
+) -> Iterator[DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if isinstance(sheet_name, int):
+            worksheet = workbook.worksheets[sheet_name]
+        else:
+            worksheet = workbook[sheet_name]
+
+        header = None
+        rows = []
+        blank_rows = 0
+        for row in worksheet.iter_rows(values_only=True):
+            row = [_convert_cell(value) for value in row]
+            while row and row[-1] == "":
+                row.pop()
+            if header is None:
+                header = row or None
+                continue
+            if not row:
+                # Blank rows count only if data follows, as with pd.read_excel
+                blank_rows += 1
+                continue
+            # Pad to the header width like pd.read_excel, so blank rows are kept
+            width = len(header)
+            rows.extend([[""] * width for _ in range(blank_rows)])
+            blank_rows = 0
+            rows.append(row[:width] + [""] * (width - len(row)))
+            if len(rows) >= chunksize:
+                yield _rows_to_dataframe(header, rows)
+                rows = []
+        if rows:
+            yield _rows_to_dataframe(header, rows)
+    finally:
+        workbook.close()
+
+
+def _read_excel_sheet(file_path: str, sheet_name: Union[int, str]) -> DataFrame:
+    """
+    Reads one worksheet with the fastest engine available.
+
+    Uses calamine when `python-calamine` is installed, otherwise the pandas default
+    engine (openpyxl opens .xlsx workbooks in read-only mode).
+    """
+    if _has_calamine():
+        return pd.read_excel(file_path, sheet_name=sheet_name, engine="calamine")
+    return pd.read_excel(file_path, sheet_name=sheet_name)
+
+
+@lru_cache(maxsize=1024)
+def _local_name(tag: str) -> str:
+    # "{namespace}row" -> "row", "ns:row" -> "row"
+    return tag.rsplit("}", 1)[-1].rsplit(":", 1)[-1]
+
+
+_XML_STEP = re.compile(r"\*|(?:[^\W\d][\w.-]*:)?[^\W\d][\w.-]*")
+
+
+class _XmlRowMatcher:
+    """
+    Matches element paths against the simple XPath forms used to select rows:
+    `./row`, `./*`, `/root/row`, `//row` and `row` (relative to the root element).
+
+    :raises ValueError: If `row_xpath` uses any other syntax, e.g. predicates,
+        attributes, functions or `..`.
+    """
+
+    def __init__(self, row_xpath: str):
+        if row_xpath.startswith("//"):
+            self.any_depth = True
+            steps = [row_xpath[2:]]
+        else:
+            self.any_depth = False
+            if row_xpath.startswith("/"):
+                steps = row_xpath[1:].split("/")
+            else:
+                # Relative paths start below the root element
+                steps = row_xpath.split("/")
+                if steps[0] == ".":
+                    steps = steps[1:]
+        if not steps or not all(_XML_STEP.fullmatch(step) for step in steps):
+            raise ValueError(
+                f"Unsupported XML row XPath {row_xpath!r}: use ./row, ./*, "
+                "/root/row, //row or row"
+            )
+        if not self.any_depth and not row_xpath.startswith("/"):
+            steps = ["*"] + steps
+        self.steps = [_local_name(s) for s in steps]
+
+    def matches(self, elements: List[ET.Element]) -> bool:
+        if self.any_depth:
+            return self.steps[0] in ("*", _local_name(elements[-1].tag))
+        if len(elements) != len(self.steps):
+            return False
+        return all(s in ("*", _local_name(e.tag)) for s, e in zip(self.steps, elements))
+
+
+def _iter_xml_records(file_path: str, row_xpath: str) -> Iterator[Dict[str, str]]:
+    # Yields the raw text of each row element, keyed by attribute and child names
+    matcher = _XmlRowMatcher(row_xpath)
+    elements: List[ET.Element] = []
+
+    for event, elem in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            elements.append(elem)
+            continue
+
+        if matcher.matches(elements):
+            record = {_local_name(k): v for k, v in elem.attrib.items()}
+            for child in elem:
+                record[_local_name(child.tag)] = child.text
+            if len(elem) == 0 and elem.text and elem.text.strip():
+                record[_local_name(elem.tag)] = elem.text
+            yield record
+
+            # Drop the parsed row so memory stays flat regardless of file size
+            elem.clear()
+            if len(elements) > 1:
+                elements[-2].remove(elem)
+
+        elements.pop()
+
+
+def _records_to_dataframe(
+    columns: Dict[str, None], records: List[Dict[str, str]]
+) -> DataFrame:
+    header = list(columns)
+    return _rows_to_dataframe(header, [[r.get(c) for c in header] for r in records])
+
+
+def _read_xml(file_path: str, row_xpath: str) -> DataFrame:
+    # Collects all raw records first so dtypes are inferred once over the whole file
+    columns: Dict[str, None] = {}
+    records = []
+    for record in _iter_xml_records(file_path, row_xpath):
+        columns.update(dict.fromkeys(record))
+        records.append(record)
+    if not records:
+        return DataFrame()
+    return _records_to_dataframe(columns, records)
+
+
+def _iter_xml_rows(
+    file_path: str, row_xpath: str, chunksize: int
+) -> Iterator[DataFrame]:
+    columns: Dict[str, None] = {}
+    records = []
+    for record in _iter_xml_records(file_path, row_xpath):
+        columns.update(dict.fromkeys(record))
+        records.append(record)
+        if len(records) >= chunksize:
+            yield _records_to_dataframe(columns, records)
+            records = []
+    if records:
+        yield _records_to_dataframe(columns, records)
+
 
 class FileSource:
+    """
+    Reads and writes a data file in one of the `SysFileType` formats.
+
+    Excel and XML use streaming readers: workbooks are read sheet by sheet with
+    calamine or read-only openpyxl, and XML rows are selected with `xml_row_xpath`
+    and parsed incrementally with `iterparse`. Use `read_chunks` to process large
+    files with flat memory, and `read_sheets` to parse several worksheets in
+    parallel processes.
+
+    :ivar file_path: Path of the file.
+    :type file_path: str
+    :ivar file_type: Format of the file.
+    :type file_type: SysFileType
+    :ivar sheet_name: Worksheet read by `read` for Excel files (index or name).
+    :type sheet_name: int or str
+    :ivar xml_row_xpath: XPath selecting the row elements of an XML file.
+    :type xml_row_xpath: str
+    """
 
-    def __init__(self, file_path, file_type: SysFileType = SysFileType.CSV):
+    def __init__(
+        self,
+        file_path,
+        file_type: SysFileType = SysFileType.CSV,
+        sheet_name: Union[int, str] = 0,
+        xml_row_xpath: str = DEFAULT_XML_ROW_XPATH,
+    ):
         self.file_path = file_path
         self.file_type = file_type
+        self.sheet_name = sheet_name
+        self.xml_row_xpath = xml_row_xpath
 
     def read(self) -> DataFrame:
         match self.file_type:
             case SysFileType.CSV:
                 return pd.read_csv(self.file_path)
             case SysFileType.EXCEL:
-                return pd.read_excel(self.file_path)
+                return _read_excel_sheet(self.file_path, self.sheet_name)
             case SysFileType.JSON:
                 return pd.read_json(self.file_path)
             case SysFileType.PARQUET:
                 return pd.read_parquet(self.file_path)
             case SysFileType.XML:
-                return pd.read_xml(self.file_path)
+                return _read_xml(self.file_path, self.xml_row_xpath)
+
+    def read_chunks(self, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[DataFrame]:
+        """
+        Yields the file as DataFrames of at most `chunksize` rows.
+
+        CSV, Excel (.xlsx and related formats) and XML are streamed, so memory use
+        depends on `chunksize` rather than on the file size. JSON, Parquet and
+        Excel formats openpyxl cannot stream are read whole and yielded once.
+
+        :param chunksize: Maximum number of rows per DataFrame.
+        :type chunksize: int
+        """
+        match self.file_type:
+            case SysFileType.CSV:
+                yield from pd.read_csv(self.file_path, chunksize=chunksize)
+            case SysFileType.EXCEL if _is_streamable_workbook(self.file_path):
+                yield from _iter_openpyxl_rows(
+                    self.file_path, self.sheet_name, chunksize
+                )
+            case SysFileType.XML:
+                yield from _iter_xml_rows(self.file_path, self.xml_row_xpath, chunksize)
+            case _:
+                yield self.read()
+
+    def read_sheets(
+        self,
+        sheet_names: Optional[List[Union[int, str]]] = None,
+        max_workers: int = None,
+    ) -> Dict[Union[int, str], DataFrame]:
+        """
+        Reads several worksheets of an Excel file in parallel processes.
+
+        :param sheet_names: Worksheets to read; all worksheets if not given.
+        :type sheet_names: list or None
+        :param max_workers: Maximum number of worker processes (default: one per
+            sheet, capped at the CPU count).
+        :type max_workers: int or None
+        :return: DataFrame per worksheet, keyed as requested.
+        :rtype: dict
+        """
+        if self.file_type != SysFileType.EXCEL:
+            raise ValueError(
+                f"read_sheets requires an Excel file, not {self.file_type}"
+            )
+        if sheet_names is None:
+            with pd.ExcelFile(self.file_path) as workbook:
+                sheet_names = list(workbook.sheet_names)
+        if len(sheet_names) <= 1:
+            return {s: _read_excel_sheet(self.file_path, s) for s in sheet_names}
+
+        max_workers = max_workers or min(len(sheet_names), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            frames = executor.map(
+                _read_excel_sheet, [self.file_path] * len(sheet_names), sheet_names
+            )
+            return dict(zip(sheet_names, frames))
 
     def write(self, df: DataFrame):
         match self.file_type:
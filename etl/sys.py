@@ -16,3 +16,15 @@ class SysFileType(Enum):
     JSON = "json"
     PARQUET = "parquet"
     XML = "xml"
+
+
+class SysTaskType(Enum):
+    FILE = "file"
+    HTTP = "http"
+
+
+class SysTaskStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
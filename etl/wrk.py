@@ -0,0 +1,638 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, TypeVar
+
+from sqlalchemy import (
+    JSON,
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Index,
+    Integer,
+    MetaData,
+    Sequence,
+    String,
+    Table,
+    Text,
+    Update,
+    and_,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from .core import EtlEnvironment
+from .dbs import EtlDbDataFrame
+from .fil import FileSource
+from .sys import SysFileType, SysFolderType, SysTaskStatus, SysTaskType
+
+if TYPE_CHECKING:
+    from .cntrl import EtlControl
+
+ACTIVE_STATUSES = [SysTaskStatus.PENDING.value, SysTaskStatus.RUNNING.value]
+CONFLICT_RETRIES = 8
+
+T = TypeVar("T")
+
+# Mirrors the ctl_work_queue migration (531027a33a3e)
+ctl_work_queue = Table(
+    "ctl_work_queue",
+    MetaData(),
+    Column(
+        "task_id",
+        Integer,
+        Sequence("ctl_work_queue_task_id_seq"),
+        primary_key=True,
+    ),
+    Column("task_type", String(20), nullable=False),
+    Column("task_key", String(200), nullable=False),
+    Column("payload", JSON),
+    Column("status", String(20), nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("worker_id", String(100)),
+    Column("leased_until", DateTime),
+    Column("heartbeat_at", DateTime),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Column("last_error", Text),
+)
+
+# Partial unique index: one active task per (task_type, task_key). Only PostgreSQL
+# supports it; elsewhere enqueue's select-then-insert can race between hosts.
+Index(
+    "ux_ctl_work_queue_active_task",
+    ctl_work_queue.c.task_type,
+    ctl_work_queue.c.task_key,
+    unique=True,
+    postgresql_where=ctl_work_queue.c.status.in_(ACTIVE_STATUSES),
+).ddl_if(dialect="postgresql")
+
+
+def _utcnow() -> datetime:
+    # Naive UTC timestamps compare the same way on PostgreSQL, MySQL and DuckDB
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _is_write_conflict(error: DBAPIError) -> bool:
+    # DuckDB reports concurrent updates of a row as a "write-write conflict";
+    # PostgreSQL as a serialization failure or deadlock
+    if getattr(error.orig, "sqlstate", None) in ("40001", "40P01"):
+        return True
+    return "conflict" in str(error.orig).lower()
+
+
+def _retry_on_conflict(operation: Callable[[], T]) -> T:
+    # Runs a transaction again, with a short randomized backoff, when it lost a
+    # write-write conflict to another worker
+    for attempt in range(CONFLICT_RETRIES):
+        try:
+            return operation()
+        except DBAPIError as e:
+            if not _is_write_conflict(e) or attempt == CONFLICT_RETRIES - 1:
+                raise
+        time.sleep(random.uniform(0.005, 0.02) * 2**attempt)
+
+
+def _execute_update(conn: Connection, stmt: Update) -> int:
+    # Count changed rows with RETURNING where available; some drivers (DuckDB)
+    # do not report a reliable rowcount for UPDATE
+    if conn.dialect.update_returning:
+        return len(conn.execute(stmt.returning(ctl_work_queue.c.task_id)).all())
+    return conn.execute(stmt).rowcount
+
+
+class EtlLeaseLostError(RuntimeError):
+    """
+    Raised by `EtlTask.check_lease` once the worker no longer holds the task.
+    """
+
+
+class EtlTask:
+    """
+    A task claimed from the work queue.
+
+    Handlers should call `check_lease` right before each step with side effects,
+    so a task whose lease was lost (and that may already be running on another
+    worker) stops instead of repeating the work.
+
+    :ivar task_id: The queue row id.
+    :type task_id: int
+    :ivar task_type: The kind of work to perform.
+    :type task_type: SysTaskType
+    :ivar task_key: The source key or file name the task works on.
+    :type task_key: str
+    :ivar payload: Task-specific parameters.
+    :type payload: dict
+    :ivar attempts: How many times the task has been claimed, including this claim.
+    :type attempts: int
+    :ivar lease_lost: Set by the worker's heartbeat once the lease could not be renewed.
+    :type lease_lost: threading.Event
+    """
+
+    def __init__(
+        self,
+        task_id: int,
+        task_type: SysTaskType,
+        task_key: str,
+        payload: Optional[Dict[str, Any]],
+        attempts: int,
+    ):
+        self.task_id = task_id
+        self.task_type = task_type
+        self.task_key = task_key
+        self.payload = payload or {}
+        self.attempts = attempts
+        self.lease_lost = threading.Event()
+
+    def check_lease(self):
+        """
+        :raises EtlLeaseLostError: If the worker no longer holds the task.
+        """
+        if self.lease_lost.is_set():
+            raise EtlLeaseLostError(f"Lease lost for {self!r}")
+
+    def __repr__(self) -> str:
+        return (
+            f"EtlTask(id={self.task_id}, type={self.task_type.value}, "
+            f"key={self.task_key}, attempts={self.attempts})"
+        )
+
+
+class EtlWorkQueue:
+    """
+    Task queue stored in the `ctl_work_queue` control table.
+
+    Workers on any number of hosts claim pending tasks under a lease. On PostgreSQL
+    the claim uses `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent workers never
+    wait on each other's rows. Other backends fall back to a conditional update
+    that only succeeds for the worker that flips the row from pending to running.
+    A worker extends its lease with `heartbeat`; tasks whose lease expired are put
+    back to pending by `requeue_expired`, or marked failed once `max_attempts` is
+    reached.
+
+    :ivar engine: Engine connected to the control database.
+    :type engine: Engine
+    :ivar lease_seconds: How long a claim or heartbeat keeps a task leased.
+    :type lease_seconds: int
+    :ivar max_attempts: How many claims a task gets before it is marked failed.
+    :type max_attempts: int
+    """
+
+    def __init__(self, eng: Engine, lease_seconds: int = 300, max_attempts: int = 3):
+        self.engine = eng
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def enqueue(
+        self,
+        task_type: SysTaskType,
+        task_key: str,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> Optional[int]:
+        """
+        Adds a pending task unless the same task is already pending or running.
+
+        On PostgreSQL a partial unique index rejects concurrent duplicates from other
+        hosts. Other backends have no such index, so two hosts enqueueing the same
+        task at the same moment can both add it.
+
+        :return: The new task id, or None if an equivalent task is already queued.
+        :rtype: int or None
+        """
+        q = ctl_work_queue
+        now = _utcnow()
+        try:
+            with self.engine.begin() as conn:
+                queued = conn.execute(
+                    select(q.c.task_id).where(
+                        q.c.task_type == task_type.value,
+                        q.c.task_key == task_key,
+                        q.c.status.in_(ACTIVE_STATUSES),
+                    )
+                ).first()
+                if queued:
+                    return None
+                result = conn.execute(
+                    insert(q).values(
+                        task_type=task_type.value,
+                        task_key=task_key,
+                        payload=payload,
+                        status=SysTaskStatus.PENDING.value,
+                        attempts=0,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                )
+                return result.inserted_primary_key[0]
+        except IntegrityError:
+            # Another host queued the same task in the meantime
+            return None
+
+    def enqueue_sources(self, control: "EtlControl", env: EtlEnvironment) -> List[int]:
+        """
+        Queues an HTTP fetch for every HTTP source and a file ingestion for every
+        inbox file whose name (without extension) matches an enabled file source.
+
+        :return: The ids of the tasks that were added.
+        :rtype: list
+        """
+        task_ids = []
+        for source in control.get_http_sources():
+            task_ids.append(
+                self.enqueue(
+                    SysTaskType.HTTP,
+                    source.source_key,
+                    {
+                        "source_url": source.source_url,
+                        "source_method": source.source_method,
+                        "source_params": source.source_params,
+                    },
+                )
+            )
+
+        file_sources = {
+            fs.file_key: fs for fs in control.get_file_sources() if fs.enabled
+        }
+        inbox_dir = env.get_folder_path(SysFolderType.INBOX)
+        for fname in sorted(os.listdir(inbox_dir)):
+            file_key = os.path.splitext(fname)[0]
+            if file_key not in file_sources:
+                continue
+            file_type = file_sources[file_key].file_type
+            task_ids.append(
+                self.enqueue(
+                    SysTaskType.FILE,
+                    fname,
+                    {
+                        "file_key": file_key,
+                        "file_type": file_type.value if file_type else None,
+                    },
+                )
+            )
+        return [task_id for task_id in task_ids if task_id is not None]
+
+    def claim(
+        self, worker_id: str, task_types: Optional[List[SysTaskType]] = None
+    ) -> Optional[EtlTask]:
+        """
+        Leases the oldest pending task to `worker_id`.
+
+        :return: The claimed task, or None if no task is available.
+        :rtype: EtlTask or None
+        """
+        q = ctl_work_queue
+        conditions = [q.c.status == SysTaskStatus.PENDING.value]
+        if task_types:
+            conditions.append(q.c.task_type.in_([t.value for t in task_types]))
+
+        candidates = select(q.c.task_id).where(*conditions).order_by(q.c.task_id)
+        if self.engine.dialect.name == "postgresql":
+            with self.engine.begin() as conn:
+                row = conn.execute(
+                    candidates.with_for_update(skip_locked=True).limit(1)
+                ).first()
+                if row is None:
+                    return None
+                return self._lease(conn, row.task_id, worker_id, conditions)
+
+        # Without row locks, try a few candidates in case another worker won the
+        # race for the first one. A lost race shows up either as no updated row or,
+        # on MVCC backends such as DuckDB, as a write-write conflict.
+        with self.engine.connect() as conn:
+            task_ids = conn.execute(candidates.limit(5)).scalars().all()
+        for task_id in task_ids:
+            try:
+                with self.engine.begin() as conn:
+                    task = self._lease(conn, task_id, worker_id, conditions)
+            except DBAPIError:
+                continue
+            if task is not None:
+                return task
+        return None
+
+    def _lease(
+        self, conn: Connection, task_id: int, worker_id: str, conditions: list
+    ) -> Optional[EtlTask]:
+        q = ctl_work_queue
+        now = _utcnow()
+        claimed = _execute_update(
+            conn,
+            update(q)
+            .where(q.c.task_id == task_id, *conditions)
+            .values(
+                status=SysTaskStatus.RUNNING.value,
+                worker_id=worker_id,
+                attempts=q.c.attempts + 1,
+                leased_until=now + timedelta(seconds=self.lease_seconds),
+                heartbeat_at=now,
+                updated_at=now,
+            ),
+        )
+        if claimed != 1:
+            return None
+        row = conn.execute(
+            select(q.c.task_type, q.c.task_key, q.c.payload, q.c.attempts).where(
+                q.c.task_id == task_id
+            )
+        ).one()
+        payload = row.payload
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        return EtlTask(
+            task_id, SysTaskType(row.task_type), row.task_key, payload, row.attempts
+        )
+
+    def heartbeat(self, task: EtlTask, worker_id: str) -> bool:
+        """
+        Extends the lease of a running task.
+
+        :return: False if the worker no longer holds the task (its lease expired
+            and the task was requeued or claimed by another worker).
+        :rtype: bool
+        """
+        now = _utcnow()
+        return (
+            self._update_owned(
+                task,
+                worker_id,
+                leased_until=now + timedelta(seconds=self.lease_seconds),
+                heartbeat_at=now,
+                updated_at=now,
+            )
+            == 1
+        )
+
+    def complete(self, task: EtlTask, worker_id: str) -> bool:
+        return (
+            self._update_owned(
+                task,
+                worker_id,
+                status=SysTaskStatus.DONE.value,
+                leased_until=None,
+                updated_at=_utcnow(),
+            )
+            == 1
+        )
+
+    def fail(self, task: EtlTask, worker_id: str, error: str) -> bool:
+        """
+        Records a failed attempt; the task is retried until `max_attempts` is reached.
+        """
+        if task.attempts >= self.max_attempts:
+            status = SysTaskStatus.FAILED
+        else:
+            status = SysTaskStatus.PENDING
+        return (
+            self._update_owned(
+                task,
+                worker_id,
+                status=status.value,
+                worker_id=None,
+                leased_until=None,
+                last_error=error,
+                updated_at=_utcnow(),
+            )
+            == 1
+        )
+
+    def requeue_expired(self) -> int:
+        """
+        Returns running tasks with an expired lease to pending, or marks them failed
+        once they have used up their attempts.
+
+        :return: The number of tasks that were requeued or failed.
+        :rtype: int
+        """
+        q = ctl_work_queue
+
+        def requeue() -> int:
+            now = _utcnow()
+            expired = and_(
+                q.c.status == SysTaskStatus.RUNNING.value, q.c.leased_until < now
+            )
+            changes = {
+                "worker_id": None,
+                "leased_until": None,
+                "last_error": "Lease expired",
+                "updated_at": now,
+            }
+            with self.engine.begin() as conn:
+                failed = _execute_update(
+                    conn,
+                    update(q)
+                    .where(expired, q.c.attempts >= self.max_attempts)
+                    .values(status=SysTaskStatus.FAILED.value, **changes),
+                )
+                requeued = _execute_update(
+                    conn,
+                    update(q)
+                    .where(expired)
+                    .values(status=SysTaskStatus.PENDING.value, **changes),
+                )
+                return failed + requeued
+
+        return _retry_on_conflict(requeue)
+
+    def _update_owned(self, task: EtlTask, owner: str, **values) -> int:
+        q = ctl_work_queue
+
+        def update_row() -> int:
+            with self.engine.begin() as conn:
+                return _execute_update(
+                    conn,
+                    update(q)
+                    .where(
+                        q.c.task_id == task.task_id,
+                        q.c.worker_id == owner,
+                        q.c.status == SysTaskStatus.RUNNING.value,
+                    )
+                    .values(**values),
+                )
+
+        return _retry_on_conflict(update_row)
+
+
+class EtlWorker:
+    """
+    Claims and runs tasks from an `EtlWorkQueue` until stopped.
+
+    While a handler runs, a background thread renews the task lease every
+    `heartbeat_seconds`. If the lease cannot be renewed, the thread sets the task's
+    `lease_lost` event, so the handler stops at its next `check_lease`. Database
+    errors are logged and never stop the worker; a task whose completion could not
+    be recorded runs again once its lease expires. Tasks are therefore processed
+    at least once, and handlers should tolerate being repeated.
+    Start several workers (on one or more hosts) against the same control database
+    to process the queue in parallel.
+
+    :ivar queue: The queue to claim tasks from.
+    :type queue: EtlWorkQueue
+    :ivar handlers: Callable per task type that performs the task.
+    :type handlers: dict
+    :ivar worker_id: Identifier recorded on claimed tasks; defaults to host:pid.
+    :type worker_id: str
+    """
+
+    def __init__(
+        self,
+        queue: EtlWorkQueue,
+        handlers: Dict[SysTaskType, Callable[[EtlTask], None]],
+        worker_id: str = None,
+        poll_seconds: float = 5.0,
+        heartbeat_seconds: float = None,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds or max(queue.lease_seconds / 3, 1)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, max_tasks: int = None, exit_when_empty: bool = False) -> int:
+        """
+        Processes tasks until `stop` is called, `max_tasks` tasks have been run, or,
+        with `exit_when_empty`, the queue has no pending task left.
+
+        :return: The number of tasks that were run.
+        :rtype: int
+        """
+        processed = 0
+        while not self._stop.is_set():
+            if max_tasks is not None and processed >= max_tasks:
+                break
+            try:
+                self.queue.requeue_expired()
+                task = self.queue.claim(self.worker_id, list(self.handlers))
+            except DBAPIError as e:
+                print(f"Worker={self.worker_id} Error={e!r}")
+                self._stop.wait(self.poll_seconds)
+                continue
+            if task is None:
+                if exit_when_empty:
+                    break
+                self._stop.wait(self.poll_seconds)
+                continue
+            self._run_task(task)
+            processed += 1
+        return processed
+
+    def _run_task(self, task: EtlTask):
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(task, done), daemon=True)
+        beat.start()
+        try:
+            self.handlers[task.task_type](task)
+        except EtlLeaseLostError as e:
+            # The task is no longer ours; whoever holds it now records the outcome
+            print(f"Task={task} Worker={self.worker_id} Error={e!r}")
+        except Exception as e:
+            print(f"Task={task} Worker={self.worker_id} Error={e!r}")
+            self._record(self.queue.fail, task, self.worker_id, repr(e))
+        else:
+            self._record(self.queue.complete, task, self.worker_id)
+        finally:
+            done.set()
+            beat.join()
+
+    def _record(self, outcome: Callable[..., bool], task: EtlTask, *args):
+        # A task whose outcome cannot be recorded stays running until its lease
+        # expires and is then requeued
+        try:
+            if not outcome(task, *args):
+                print(f"Task={task} Worker={self.worker_id} lost its lease")
+        except DBAPIError as e:
+            print(f"Task={task} Worker={self.worker_id} Error={e!r}")
+
+    def _heartbeat(self, task: EtlTask, done: threading.Event):
+        renewed_at = time.monotonic()
+        while not done.wait(self.heartbeat_seconds):
+            try:
+                if self.queue.heartbeat(task, self.worker_id):
+                    renewed_at = time.monotonic()
+                    continue
+            except Exception as e:
+                print(f"Task={task} Worker={self.worker_id} Heartbeat error={e!r}")
+                # Keep trying while the next renewal can still beat the lease expiry
+                elapsed = time.monotonic() - renewed_at
+                if elapsed + self.heartbeat_seconds < self.queue.lease_seconds:
+                    continue
+            print(f"Task={task} Worker={self.worker_id} lost its lease")
+            task.lease_lost.set()
+            return
+
+
+def file_ingest_handler(
+    env: EtlEnvironment, db: EtlDbDataFrame
+) -> Callable[[EtlTask], None]:
+    """
+    Builds a handler that loads an inbox file into the table named by its file key.
+
+    Once loaded, the file is moved from the inbox to the DATA folder so it is not
+    queued and appended again by the next `enqueue_sources`. The lease is checked
+    before the append and the move, so a worker that lost the task does not load
+    the file a second time.
+    """
+
+    def handle(task: EtlTask):
+        file_path = os.path.join(
+            env.get_folder_path(SysFolderType.INBOX), task.task_key
+        )
+        file_type = task.payload.get("file_type")
+        fs = FileSource(
+            file_path, SysFileType(file_type) if file_type else SysFileType.CSV
+        )
+        df = fs.read()
+        task.check_lease()
+        db.write_dataframe_to_sql_append(df, task.payload["file_key"])
+        task.check_lease()
+        os.replace(
+            file_path,
+            os.path.join(env.get_folder_path(SysFolderType.DATA), task.task_key),
+        )
+
+    return handle
+
+
+def http_fetch_handler(
+    env: EtlEnvironment, timeout: float = 60
+) -> Callable[[EtlTask], None]:
+    """
+    Builds a handler that downloads an HTTP source into the inbox as `<source_key>.json`.
+    """
+
+    def handle(task: EtlTask):
+        method = (task.payload.get("source_method") or "GET").upper()
+        params = task.payload.get("source_params") or {}
+        url = task.payload["source_url"]
+        data = None
+        if method == "GET":
+            if params:
+                url = f"{url}?{urllib.parse.urlencode(params)}"
+        else:
+            data = json.dumps(params).encode()
+        request = urllib.request.Request(
+            url, data=data, method=method, headers={"Content-Type": "application/json"}
+        )
+        target = os.path.join(
+            env.get_folder_path(SysFolderType.INBOX), f"{task.task_key}.json"
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            with open(f"{target}.part", "wb") as out:
+                while chunk := response.read(1024 * 1024):
+                    out.write(chunk)
+        task.check_lease()
+        os.replace(f"{target}.part", target)
+
+    return handle
@@ -0,0 +1,78 @@
+"""Setup work queue table
+
+Revision ID: 531027a33a3e
+Revises: e8ba08948a48
+Create Date: 2026-10-19 11:02:14.318207
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "531027a33a3e"
+down_revision: Union[str, Sequence[str], None] = "e8ba08948a48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# A sequence rather than an identity column keeps task ids working on DuckDB,
+# which does not support identity columns; MySQL falls back to AUTO_INCREMENT.
+task_id_seq = sa.Sequence("ctl_work_queue_task_id_seq")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.CreateSequence(task_id_seq))
+    op.create_table(
+        "ctl_work_queue",
+        sa.Column("task_id", sa.Integer(), task_id_seq, comment="Task id"),
+        sa.Column("task_type", sa.String(20), nullable=False, comment="Task type"),
+        sa.Column("task_key", sa.String(200), nullable=False, comment="Task key"),
+        sa.Column("payload", sa.JSON(), nullable=True, comment="Task payload"),
+        sa.Column("status", sa.String(20), nullable=False, comment="Task status"),
+        sa.Column("attempts", sa.Integer(), nullable=False, comment="Claim count"),
+        sa.Column(
+            "worker_id", sa.String(100), nullable=True, comment="Claiming worker"
+        ),
+        sa.Column("leased_until", sa.DateTime(), nullable=True, comment="Lease expiry"),
+        sa.Column(
+            "heartbeat_at", sa.DateTime(), nullable=True, comment="Last heartbeat"
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="Enqueued at"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="Last change"),
+        sa.Column("last_error", sa.Text(), nullable=True, comment="Last failure"),
+        sa.PrimaryKeyConstraint("task_id"),
+    )
+    op.create_index(
+        "ix_ctl_work_queue_status_task_id", "ctl_work_queue", ["status", "task_id"]
+    )
+    op.create_index(
+        "ix_ctl_work_queue_status_leased_until",
+        "ctl_work_queue",
+        ["status", "leased_until"],
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        # One active task per (task_type, task_key), so concurrent enqueues from
+        # several hosts cannot queue duplicates. Other backends lack partial indexes.
+        op.create_index(
+            "ux_ctl_work_queue_active_task",
+            "ctl_work_queue",
+            ["task_type", "task_key"],
+            unique=True,
+            postgresql_where=sa.text("status IN ('pending', 'running')"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ux_ctl_work_queue_active_task", table_name="ctl_work_queue")
+    op.drop_index("ix_ctl_work_queue_status_leased_until", table_name="ctl_work_queue")
+    op.drop_index("ix_ctl_work_queue_status_task_id", table_name="ctl_work_queue")
+    op.drop_table("ctl_work_queue")
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.DropSequence(task_id_seq))
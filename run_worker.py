@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script to run a queue worker that processes file-ingestion and HTTP-fetch tasks
+from the ctl_work_queue table.
+
+Start as many workers as needed, on one or more hosts, against the same control
+database. Workers coordinate through the queue table only.
+
+Usage:
+    # Queue tasks for all HTTP sources and matching inbox files
+    python run_worker.py --enqueue
+
+    # Run a worker until stopped
+    python run_worker.py
+
+    # Run a worker against the dev environment and exit once the queue is empty
+    python run_worker.py --env dev --exit-when-empty
+"""
+
+import argparse
+from dotenv import load_dotenv
+
+from etl.core import EtlEnvironment
+from etl.dba import EtlDbConfig, EtlDbSource
+from etl.dbs import EtlDbDataFrame
+from etl.sys import SysTaskType
+from etl.wrk import EtlWorker, EtlWorkQueue, file_ingest_handler, http_fetch_handler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a worker that processes tasks from the ctl_work_queue table"
+    )
+    parser.add_argument(
+        "--env",
+        type=str,
+        help="Environment name (e.g., dev, prod) for database connection",
+    )
+    parser.add_argument("--root", type=str, default=".", help="ETL system root")
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="Queue tasks for the configured sources and exit",
+    )
+    parser.add_argument("--worker-id", type=str, help="Worker id (default: host:pid)")
+    parser.add_argument(
+        "--lease", type=int, default=300, help="Task lease in seconds (default: 300)"
+    )
+    parser.add_argument(
+        "--poll", type=float, default=5.0, help="Idle poll interval in seconds"
+    )
+    parser.add_argument("--max-tasks", type=int, help="Stop after this many tasks")
+    parser.add_argument(
+        "--exit-when-empty",
+        action="store_true",
+        help="Stop when no pending task is left",
+    )
+
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv()
+
+    # Setup database connection
+    db_config = EtlDbConfig(args.env)
+    engine = EtlDbSource(db_config).get_engine()
+    env = EtlEnvironment(args.root)
+    env.check_folders()
+    queue = EtlWorkQueue(engine, lease_seconds=args.lease)
+
+    if args.enqueue:
+        # Imported here so workers do not need the ORM control models
+        from etl.cntrl import EtlControl
+
+        task_ids = queue.enqueue_sources(EtlControl(engine), env)
+        print(f"Queued {len(task_ids)} task(s)")
+        return
+
+    worker = EtlWorker(
+        queue,
+        {
+            SysTaskType.FILE: file_ingest_handler(
+                env, EtlDbDataFrame(engine, db_config.db_schema)
+            ),
+            SysTaskType.HTTP: http_fetch_handler(env),
+        },
+        worker_id=args.worker_id,
+        poll_seconds=args.poll,
+    )
+    try:
+        processed = worker.run(args.max_tasks, args.exit_when_empty)
+    except KeyboardInterrupt:
+        worker.stop()
+        processed = None
+    print(f"Worker={worker.worker_id} processed={processed}")
+
+
+if __name__ == "__main__":
+    main()